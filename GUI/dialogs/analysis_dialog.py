@@ -6,8 +6,8 @@ from PySide6.QtWidgets import (
 )
 from PySide6.QtCore import Qt
 import pandas as pd
-import json
 from logger_manager import LoggerManager
+from utils import dump_json
 
 def show_analysis_dialog(code, name, results, parent=None, logger_manager=None):
     """显示分析结果对话框"""
@@ -91,8 +91,7 @@ class AnalysisDialog(QDialog):
                 return
                 
             # 保存结果
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(self.results, f, ensure_ascii=False, indent=2)
+            dump_json(self.results, file_path)
                 
             self.logger.info(f"保存分析结果到: {file_path}")
             
@@ -5,9 +5,9 @@ from PySide6.QtWidgets import (
     QPushButton, QLabel, QSpinBox, QDoubleSpinBox, QFormLayout
 )
 from PySide6.QtCore import Signal, Qt
-import json
 import os
 from logger_manager import LoggerManager
+from utils import load_json, dump_json
 
 class StrategySelector(QWidget):
     """策略选择器组件"""
@@ -61,18 +61,19 @@ class StrategySelector(QWidget):
     def load_settings(self):
         """加载策略设置"""
         try:
-            if os.path.exists(self.settings_file):
-                with open(self.settings_file, 'r', encoding='utf-8') as f:
-                    settings = json.load(f)
+            try:
+                settings = load_json(self.settings_file)
+            except FileNotFoundError:
+                return
+                
+            # 设置选中状态
+            for i in range(self.strategy_list.count()):
+                item = self.strategy_list.item(i)
+                strategy_id = item.data(Qt.UserRole)
+                if strategy_id in settings:
+                    item.setSelected(True)
                     
-                # 设置选中状态
-                for i in range(self.strategy_list.count()):
-                    item = self.strategy_list.item(i)
-                    strategy_id = item.data(Qt.UserRole)
-                    if strategy_id in settings:
-                        item.setSelected(True)
-                        
-                self.logger.info("加载策略设置成功")
+            self.logger.info("加载策略设置成功")
                 
         except Exception as e:
             self.logger.error(f"加载策略设置失败: {str(e)}")
@@ -87,8 +88,7 @@ class StrategySelector(QWidget):
                     strategy_id = item.data(Qt.UserRole)
                     settings[strategy_id] = {}
                     
-            with open(self.settings_file, 'w', encoding='utf-8') as f:
-                json.dump(settings, f, ensure_ascii=False, indent=2)
+            dump_json(settings, self.settings_file)
                 
             self.logger.info("保存策略设置成功")
             
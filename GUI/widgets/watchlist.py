@@ -6,9 +6,9 @@ from PySide6.QtWidgets import (
 )
 from PySide6.QtCore import Qt, QTimer, Signal
 import pandas as pd
-import json
 import os
 from data_fetcher import DataFetcher
+from utils import load_json, dump_json
 from logger_manager import LoggerManager
 
 class WatchlistWidget(QWidget):
@@ -66,10 +66,9 @@ class WatchlistWidget(QWidget):
     def load_watchlist(self):
         """加载自选股列表"""
         try:
-            if os.path.exists(self.watchlist_file):
-                with open(self.watchlist_file, 'r', encoding='utf-8') as f:
-                    watchlist = json.load(f)
-            else:
+            try:
+                watchlist = load_json(self.watchlist_file)
+            except FileNotFoundError:
                 watchlist = []
                 
             self.update_table(watchlist)
@@ -87,8 +86,7 @@ class WatchlistWidget(QWidget):
                 name = self.table.item(row, 2).text()
                 watchlist.append({'code': code, 'name': name})
                 
-            with open(self.watchlist_file, 'w', encoding='utf-8') as f:
-                json.dump(watchlist, f, ensure_ascii=False, indent=2)
+            dump_json(watchlist, self.watchlist_file)
                 
             self.logger.info(f"保存了 {len(watchlist)} 只自选股")
             
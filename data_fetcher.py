@@ -4,14 +4,45 @@ import akshare as ak
 import pandas as pd
 import time
 import os
-import traceback
 from logger_manager import LoggerManager
-from utils import get_stock_info, is_weekday
+from utils import get_stock_info, invalidate_stock_names, is_weekday, dump_json, load_json
 import random
+import threading
+from collections import deque
 from colorama import Fore, Style
-from settings import STOCK_DATA_CACHE_DIR, CACHE_DURATION, MAX_RETRIES, RETRY_DELAY, START_DATE, END_DATE
+from settings import STOCK_DATA_CACHE_DIR, STOCK_LIST_CACHE_DIR, CACHE_DURATION, MAX_RETRIES, RETRY_DELAY, START_DATE, END_DATE, REQUEST_RATE_LIMIT, REQUEST_BURST
 from datetime import datetime
 
+# pyarrow为可选依赖：已安装时日线数据缓存为zstd压缩的Parquet，读写都比CSV快，否则仍使用CSV
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+CACHE_FORMAT = 'parquet' if pyarrow is not None else 'csv'
+
+class _TokenBucket:
+    """线程安全的令牌桶，限制每秒请求数（允许短时突发capacity个请求）"""
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1, rate)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+        
+    def acquire(self):
+        """取得一个令牌，令牌不足时只阻塞当前线程，等待补充所需的时间"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
 class DataFetcher:
     """数据获取器"""
     def __init__(self, logger_manager=None):
@@ -24,10 +55,16 @@ class DataFetcher:
         self.cache_duration = CACHE_DURATION
         self.max_retries = MAX_RETRIES
         self.retry_delay = RETRY_DELAY
-        self.request_interval = 0.01
+        self.request_rate = REQUEST_RATE_LIMIT
+        # 所有线程共享的请求限流：每秒最多request_rate个请求，短时突发不超过REQUEST_BURST个
+        self._rate_limiter = _TokenBucket(self.request_rate, REQUEST_BURST)
         self.start_date = START_DATE
         self.end_date = END_DATE
         
+        # 最近若干次网络请求是否失败，用于判断是否被限流
+        self._recent_failures = deque(maxlen=20)
+        self.rate_limit_threshold = 0.2  # 失败率超过该值时才在请求之间随机延时
+        
         # 确保缓存目录存在
         os.makedirs(self.cache_dir, exist_ok=True)
         
@@ -77,11 +114,53 @@ class DataFetcher:
             self.logger.error(f"验证股票 {code} 数据时出错: {str(e)}")
             return False
             
-    def get_stock_list(self):
-        """获取A股列表（已剔除ST、退市、科创板和北交所股票）"""
+    def _load_stock_list_cache(self, cache_file):
+        """读取当天的股票列表缓存并清理以前日期的缓存，缓存不存在或无效时返回None"""
+        cache_name = os.path.basename(cache_file)
+        for entry in os.scandir(STOCK_LIST_CACHE_DIR):
+            if entry.name.startswith('valid_stocks_') and entry.name != cache_name:
+                os.remove(entry.path)
+        try:
+            return load_json(cache_file)
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            self.logger.warning(f"股票列表缓存无效，将重新获取: {str(e)}")
+            return None
+            
+    def get_spot_snapshot(self):
+        """获取A股实时行情快照（经过请求限流），获取失败时返回None"""
+        try:
+            self._rate_limiter.acquire()
+            spot = ak.stock_zh_a_spot_em()
+            if spot is None or spot.empty:
+                self.logger.warning("获取实时行情快照为空")
+                return None
+            return spot
+            
+        except Exception as e:
+            self.logger.warning(f"获取实时行情快照失败: {str(e)}")
+            return None
+            
+    def get_stock_list(self, spot=None):
+        """获取A股列表（已剔除ST、退市、科创板和北交所股票），同一天内复用本地缓存
+        
+        :param spot: 已获取的实时行情快照，本地缓存失效时直接用它生成股票列表，不再重复请求接口
+        """
         try:
             print(f"\n{Fore.CYAN}正在获取A股列表...{Style.RESET_ALL}")
-            stock_list = get_stock_info()
+            cache_file = os.path.join(STOCK_LIST_CACHE_DIR, f"valid_stocks_{datetime.now().strftime('%Y%m%d')}.json")
+            stock_list = self._load_stock_list_cache(cache_file)
+            if stock_list:
+                self.logger.info(f"从缓存加载股票列表: {cache_file}")
+            else:
+                if spot is None:
+                    self._rate_limiter.acquire()
+                stock_list = get_stock_info(spot)
+                if stock_list:
+                    dump_json(stock_list, cache_file)
+                    # 股票列表已从接口刷新，名称字典也随之重新获取
+                    invalidate_stock_names()
             
             if stock_list is None or len(stock_list) == 0:
                 print(f"{Fore.RED}获取股票列表失败{Style.RESET_ALL}")
@@ -94,8 +173,7 @@ class DataFetcher:
             
         except Exception as e:
             print(f"{Fore.RED}获取股票列表失败: {str(e)}{Style.RESET_ALL}")
-            self.logger.error(f"Error getting stock list: {str(e)}")
-            self.logger.error(traceback.format_exc())
+            self.logger.exception(f"Error getting stock list: {str(e)}")
             return None
             
     def _standardize_columns(self, df):
@@ -177,10 +255,12 @@ class DataFetcher:
                 time.sleep(self.retry_delay * (2 ** (retries - 1)))
                 
             # 获取数据
-            self.logger.info(f"从网络获取数据: {code}")
+            self._rate_limiter.acquire()
+            self.logger.debug("从网络获取数据: %s", code)
             df = ak.stock_zh_a_hist(symbol=code,start_date=start_date, end_date=end_date, adjust="qfq")
             
             if df is None or df.empty:
+                self._recent_failures.append(True)
                 if retries < self.max_retries:
                     self.logger.warning(f"获取股票 {code} 数据为空，尝试重新获取 (重试 {retries + 1}/{self.max_retries})")
                     return self._fetch_stock_data(code, retries + 1, start_date, end_date)
@@ -201,44 +281,77 @@ class DataFetcher:
                 
             # 保存缓存前确保数据有效
             if not df.empty:
-                cache_file = os.path.join(self.cache_dir, f"{code}_daily.csv")
-                df.to_csv(cache_file)
-                self.logger.info(f"数据已缓存: {code}")
+                self._save_cache(df, code)
+                self.logger.debug("数据已缓存: %s", code)
             
-            # 添加随机延时，避免请求过快
-            time.sleep(random.uniform(0.5, 1.5))
+            # 仅在疑似被限流时添加随机延时，正常情况下不浪费等待时间
+            self._recent_failures.append(False)
+            if self._is_rate_limited():
+                time.sleep(random.uniform(0.5, 1.5))
             
             return df
             
         except Exception as e:
             self.logger.error(f"获取股票 {code} 数据时出错: {str(e)}")
+            self._recent_failures.append(True)
             if retries < self.max_retries:
                 self.logger.warning(f"尝试重新获取股票 {code} 数据 (重试 {retries + 1}/{self.max_retries})")
                 return self._fetch_stock_data(code, retries + 1)
             return None
             
+    def _cache_file(self, code):
+        """股票日线数据的缓存文件路径"""
+        return os.path.join(self.cache_dir, f"{code}_daily.{CACHE_FORMAT}")
+        
+    def _save_cache(self, df, code):
+        """写入日线数据缓存（先写临时文件再替换，避免其他进程读到写了一半的文件）"""
+        cache_file = self._cache_file(code)
+        tmp_file = f"{cache_file}.tmp.{os.getpid()}.{threading.get_ident()}"
+        if CACHE_FORMAT == 'parquet':
+            df.to_parquet(tmp_file, compression='zstd')
+        else:
+            df.to_csv(tmp_file)
+        os.replace(tmp_file, cache_file)
+        
+    def _read_cache(self, cache_file, columns=None):
+        """读取日线数据缓存，返回以date为索引的DataFrame
+        
+        :param columns: 只读取这些数据列（日期索引总会读取），None表示读取全部列
+        """
+        if CACHE_FORMAT == 'parquet':
+            return pd.read_parquet(cache_file, columns=columns)
+        df = pd.read_csv(cache_file, usecols=None if columns is None else ['date', *columns])
+        if 'date' in df.columns:
+            df['date'] = pd.to_datetime(df['date'])
+            df.set_index('date', inplace=True)
+        return df
+            
+    def _is_rate_limited(self):
+        """根据最近的请求失败率判断是否疑似被限流"""
+        failures = list(self._recent_failures)
+        return bool(failures) and sum(failures) / len(failures) > self.rate_limit_threshold
+            
     def _should_update_data(self, code, cache_file):
         """判断是否需要更新数据"""
         try:
-            if not os.path.exists(cache_file):
+            # 一次stat同时判断缓存是否存在并获取最后修改时间
+            try:
+                cache_time = datetime.fromtimestamp(os.stat(cache_file).st_mtime)
+            except FileNotFoundError:
                 return True
-                
-            # 获取缓存文件的最后修改时间
-            cache_time = datetime.fromtimestamp(os.path.getmtime(cache_file))
             current_time = datetime.now()
             
-            # 读取缓存数据以检查最新日期
+            # 读取缓存数据以检查最新日期（只需要日期，不读取数据列）
             try:
-                cached_data = pd.read_csv(cache_file)
-                if 'date' in cached_data.columns:
-                    cached_data['date'] = pd.to_datetime(cached_data['date'])
-                    latest_data_date = cached_data['date'].max()
+                cached_data = self._read_cache(cache_file, columns=[])
+                if cached_data.index.name == 'date':
+                    latest_data_date = cached_data.index.max()
                     
                     # 如果最新数据不是今天或昨天的，需要更新
                     latest_date = latest_data_date.date()
                     today = current_time.date()
                     if latest_date < today:
-                        self.logger.info(f"股票 {code} 的数据不是最新的（最新日期：{latest_date}），需要更新")
+                        self.logger.debug("股票 %s 的数据不是最新的（最新日期：%s），需要更新", code, latest_date)
                         return True
             except Exception as e:
                 self.logger.warning(f"读取缓存文件失败 {code}: {str(e)}")
@@ -267,7 +380,7 @@ class DataFetcher:
                 if last_trading_day:
                     cache_date = cache_time.date()
                     if cache_date < last_trading_day:
-                        self.logger.info(f"股票 {code} 的数据不是最近交易日的数据，需要更新")
+                        self.logger.debug("股票 %s 的数据不是最近交易日的数据，需要更新", code)
                         return True
                     elif cache_date == last_trading_day and cache_time.hour < 15:
                         return True
@@ -314,42 +427,66 @@ class DataFetcher:
                 code = str(stock)
                 name = None
             
-            self.logger.info(f"获取股票数据: {code}")
+            self.logger.debug("获取股票数据: %s", code)
             
             # 检查缓存
-            cache_file = os.path.join(self.cache_dir, f"{code}_daily.csv")
+            cache_file = self._cache_file(code)
             
             # 判断是否需要更新数据
             if self._should_update_data(code, cache_file):
-                self.logger.info(f"需要更新股票 {code} 的数据")
+                self.logger.debug("需要更新股票 %s 的数据", code)
                 # 从网络获取新数据
                 df = self._fetch_stock_data(code)
                 if df is not None:
-                    self.logger.info(f"成功获取股票 {code} 数据")
+                    self.logger.debug("成功获取股票 %s 数据", code)
                     return df
                 else:
                     self.logger.error(f"获取股票 {code} 数据失败")
-                    # 如果获取失败但存在缓存，尝试使用缓存
-                    if os.path.exists(cache_file):
-                        self.logger.info(f"尝试使用缓存数据: {code}")
-                        df = pd.read_csv(cache_file)
-                        if not df.empty and 'date' in df.columns:
-                            df['date'] = pd.to_datetime(df['date'])
-                            df.set_index('date', inplace=True)
-                            if self._validate_data(df, code):
-                                return df
-                    return None
+                    # 如果获取失败，尝试使用缓存（缓存不存在时load_cached_data返回None）
+                    self.logger.debug("尝试使用缓存数据: %s", code)
+                    return self.load_cached_data(code)
             else:
                 # 使用缓存数据
-                self.logger.info(f"使用缓存数据: {code}")
-                df = pd.read_csv(cache_file)
-                if not df.empty and 'date' in df.columns:
-                    df['date'] = pd.to_datetime(df['date'])
-                    df.set_index('date', inplace=True)
-                    if self._validate_data(df, code):
-                        return df
-                return None
+                self.logger.debug("使用缓存数据: %s", code)
+                return self.load_cached_data(code)
             
         except Exception as e:
             self.logger.error(f"获取股票 {code} 数据时出错: {str(e)}")
-            return None
\ No newline at end of file
+            return None
+            
+    def refresh_stock_data(self, code):
+        """只确保本地缓存是最新的（过期时从网络下载），不读取数据，返回缓存是否可用"""
+        try:
+            cache_file = self._cache_file(code)
+            if not self._should_update_data(code, cache_file):
+                return True
+            if self._fetch_stock_data(code) is not None:
+                return True
+            # 下载失败时沿用已有缓存
+            try:
+                os.stat(cache_file)
+                return True
+            except FileNotFoundError:
+                return False
+                
+        except Exception as e:
+            self.logger.error(f"更新股票 {code} 数据时出错: {str(e)}")
+            return False
+            
+    def load_cached_data(self, code):
+        """直接读取本地缓存数据（不检查时效性），缓存不存在或无效时返回None"""
+        try:
+            # 直接读取，缓存不存在时捕获异常，省去每只股票一次额外的stat调用
+            try:
+                df = self._read_cache(self._cache_file(code))
+            except FileNotFoundError:
+                return None
+                
+            if not df.empty and df.index.name == 'date':
+                if self._validate_data(df, code):
+                    return df
+            return None
+            
+        except Exception as e:
+            self.logger.error(f"读取股票 {code} 缓存数据时出错: {str(e)}")
+            return None
@@ -9,8 +9,10 @@ class LoggerManager:
     
     def __init__(self, base_dir="."):
         self.base_dir = base_dir
-        self.timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        self.date = datetime.now().strftime('%Y%m%d')
+        # 只取一次当前时间，避免跨零点时日期与时间戳不一致
+        now = datetime.now()
+        self.timestamp = now.strftime('%Y%m%d_%H%M%S')
+        self.date = now.strftime('%Y%m%d')
         
         # 创建日志目录结构
         self.log_dir = os.path.join(base_dir, 'logs', self.date)
@@ -60,6 +60,13 @@ def main():
                 logger.error("分析任务执行失败")
                 return 1
                 
+    except KeyboardInterrupt:
+        # 已完成的分析结果已保存在检查点，重新运行时从断点继续
+        if 'logger' in locals():
+            logger.warning("用户中断，已退出")
+        else:
+            print("用户中断，已退出")
+        return 130
     except Exception as e:
         if 'logger' in locals():
             logger.error(f"系统运行出错: {str(e)}")
@@ -24,6 +24,14 @@ RETRY_DELAY = 2
 START_DATE = '20240101'
 END_DATE = datetime.now().strftime('%Y%m%d')
 
+# Request rate limiting, shared by all fetch threads.
+# The original fetcher ran up to 64 threads, each sleeping 0.5-1.5 s after
+# every request, i.e. at most about 64 req/s and 40-50 req/s in practice;
+# the default keeps that throughput. Lower it if the data source starts
+# rejecting requests.
+REQUEST_RATE_LIMIT = 50  # requests per second
+REQUEST_BURST = 10  # requests allowed in a short burst
+
 # Ensure cache directories exist
 for cache_dir in [STOCK_DATA_CACHE_DIR, STOCK_LIST_CACHE_DIR, ANALYSIS_CACHE_DIR, NEWS_CACHE_DIR]:
     os.makedirs(cache_dir, exist_ok=True)
@@ -1,4 +1,5 @@
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 import pandas as pd
 import talib as ta
 from strategy.base import BaseStrategy
@@ -19,50 +20,35 @@ class RSRS_Strategy(BaseStrategy):
             high = data['high'].values
             low = data['low'].values
             
-            # 计算斜率和R²
-            slopes = []
-            r2s = []
+            # 所有窗口一次性做最小二乘回归（high = a + b * low），取代逐窗口调用lstsq
+            x = sliding_window_view(low.astype(np.float64), window_size)
+            y = sliding_window_view(high.astype(np.float64), window_size)
+            x_mean = x.mean(axis=1)
+            y_mean = y.mean(axis=1)
+            dx = x - x_mean[:, None]
+            dy = y - y_mean[:, None]
+            sxx = np.einsum('ij,ij->i', dx, dx)
+            sxy = np.einsum('ij,ij->i', dx, dy)
+            syy = np.einsum('ij,ij->i', dy, dy)
             
-            for i in range(len(data) - window_size + 1):
-                x = low[i:i+window_size]
-                y = high[i:i+window_size]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                # low在窗口内不变时回归退化，与lstsq的最小范数解保持一致
+                slopes = np.where(sxx > 0, sxy / sxx, y_mean * x_mean / (1 + x_mean ** 2))
+                # R² = 1 - 残差平方和/总离差平方和；总离差平方和为0时R²记为0
+                r2s = np.where((sxx > 0) & (syy > 0), sxy * sxy / (sxx * syy), 0.0)
                 
-                if len(x) < window_size:
-                    continue
-                    
-                # 添加常数项
-                X = np.column_stack([np.ones_like(x), x])
-                
-                # 最小二乘法
-                try:
-                    beta = np.linalg.lstsq(X, y, rcond=None)[0]
-                    y_pred = np.dot(X, beta)
-                    
-                    # 计算R²，避免除零
-                    y_mean = y.mean()
-                    ss_tot = np.sum((y - y_mean) ** 2)
-                    ss_res = np.sum((y - y_pred) ** 2)
-                    
-                    if ss_tot == 0:  # 如果总离差平方和为0
-                        r2 = 0  # 说明所有值都相同，设置R²为0
-                    else:
-                        r2 = 1 - ss_res / ss_tot
-                        
-                    slopes.append(beta[1])
-                    r2s.append(r2)
-                    
-                except Exception as e:
-                    self.logger.warning(f"计算RSRS指标失败: {str(e)}")
-                    slopes.append(np.nan)
-                    r2s.append(np.nan)
-                    
-            return np.array(slopes), np.array(r2s)
+            # 窗口内含缺失值时无法回归
+            invalid = ~(np.isfinite(sxx) & np.isfinite(sxy) & np.isfinite(syy))
+            slopes[invalid] = np.nan
+            r2s[invalid] = np.nan
+            
+            return slopes, r2s
             
         except Exception as e:
             self.logger.error(f"RSRS指标计算失败: {str(e)}")
             return np.array([]), np.array([])
             
-    def analyze(self, data):
+    def analyze(self, data, ctx=None):
         """分析数据"""
         try:
             if len(data) < self.window_size * 2:
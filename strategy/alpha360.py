@@ -35,7 +35,7 @@ class Alpha360Strategy(BaseStrategy):
         
         return pd.DataFrame(factors)
         
-    def calculate_volume_factors(self, data):
+    def calculate_volume_factors(self, data, ctx=None):
         """计算成交量类因子"""
         volume = data['volume']
         close = data['close']
@@ -43,7 +43,7 @@ class Alpha360Strategy(BaseStrategy):
         factors = {}
         # 成交量变化
         factors['vol_change'] = volume.pct_change()
-        factors['vol_ma_ratio'] = volume / volume.rolling(20).mean()
+        factors['vol_ma_ratio'] = volume / self._rolling_mean(data, 'volume', 20, ctx)
         
         # 量价关系
         factors['vol_price_corr'] = close.rolling(20).corr(volume)
@@ -88,7 +88,7 @@ class Alpha360Strategy(BaseStrategy):
         
         return pd.DataFrame(factors)
         
-    def analyze(self, data):
+    def analyze(self, data, ctx=None):
         """分析数据"""
         try:
             if not self._validate_data(data):
@@ -96,7 +96,7 @@ class Alpha360Strategy(BaseStrategy):
                 
             # 计算各类因子
             momentum_factors = self.calculate_momentum_factors(data)
-            volume_factors = self.calculate_volume_factors(data)
+            volume_factors = self.calculate_volume_factors(data, ctx)
             volatility_factors = self.calculate_volatility_factors(data)
             trend_factors = self.calculate_trend_factors(data)
             
@@ -97,7 +97,7 @@ class Alpha101Strategy(BaseStrategy):
             self.logger.error(f"检查基本条件失败: {str(e)}")
             return False, str(e)
             
-    def analyze(self, data):
+    def analyze(self, data, ctx=None):
         """分析数据"""
         try:
             if len(data) < self.window_size:
@@ -106,7 +106,7 @@ class Alpha101Strategy(BaseStrategy):
             # 检查基本条件
             passed, message = self.check_basic_conditions(data)
             if not passed:
-                self.logger.info(f"基本条件检查未通过: {message}")
+                self.logger.debug("基本条件检查未通过: %s", message)
                 return None
                 
             # 计算因子
@@ -124,8 +124,8 @@ class Alpha101Strategy(BaseStrategy):
             
             # 计算技术指标
             close = data['close']
-            ma20 = close.rolling(window=20).mean()
-            ma60 = close.rolling(window=60).mean()
+            ma20 = self._rolling_mean(data, 'close', 20, ctx)
+            ma60 = self._rolling_mean(data, 'close', 60, ctx)
             
             # 获取最新价格和均线
             latest_price = close.iloc[-1]
@@ -23,7 +23,7 @@ class Alpha191Strategy(BaseStrategy):
         self.max_price = 200.0        # 最高价格
         self.min_volume = 200000      # 最小成交量
         
-    def check_basic_conditions(self, data):
+    def check_basic_conditions(self, data, ctx=None):
         """检查基本条件"""
         try:
             if len(data) < 60:
@@ -43,8 +43,8 @@ class Alpha191Strategy(BaseStrategy):
                 return False, "成交量过低"
                 
             # 检查趋势
-            ma20 = data['close'].rolling(20).mean()
-            ma60 = data['close'].rolling(60).mean()
+            ma20 = self._rolling_mean(data, 'close', 20, ctx)
+            ma60 = self._rolling_mean(data, 'close', 60, ctx)
             if latest['close'] < ma20.iloc[-1] or ma20.iloc[-1] < ma60.iloc[-1]:
                 return False, "趋势不符"
                 
@@ -215,13 +215,13 @@ class Alpha191Strategy(BaseStrategy):
             self.logger.error(f"数据验证失败: {str(e)}")
             return False
 
-    def analyze(self, data):
+    def analyze(self, data, ctx=None):
         """分析数据"""
         try:
             # 检查基本条件
-            passed, message = self.check_basic_conditions(data)
+            passed, message = self.check_basic_conditions(data, ctx)
             if not passed:
-                self.logger.info(f"基本条件检查未通过: {message}")
+                self.logger.debug("基本条件检查未通过: %s", message)
                 return None
                 
             # 计算各个Alpha因子
@@ -247,8 +247,8 @@ class Alpha191Strategy(BaseStrategy):
             
             # 计算技术指标
             close = data['close']
-            ma20 = close.rolling(20).mean()
-            ma60 = close.rolling(60).mean()
+            ma20 = self._rolling_mean(data, 'close', 20, ctx)
+            ma60 = self._rolling_mean(data, 'close', 60, ctx)
             
             # 综合信号判断
             buy_signals = 0
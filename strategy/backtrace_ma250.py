@@ -15,7 +15,7 @@ class BacktraceMA250Strategy(BaseStrategy):
         self.volume_ratio = 1.5  # 成交量放大倍数
         self.rsi_threshold = 50  # RSI阈值
         
-    def calculate_indicators(self, data):
+    def calculate_indicators(self, data, ctx=None):
         """计算技术指标"""
         try:
             # 确保数据是DataFrame格式
@@ -32,7 +32,7 @@ class BacktraceMA250Strategy(BaseStrategy):
             
             # 计算成交量比率
             volume_series = pd.Series(data['volume'], index=data.index)
-            volume_ma = volume_series.rolling(window=20).mean()
+            volume_ma = self._rolling_mean(data, 'volume', 20, ctx)
             volume_ratio = volume_series / volume_ma
             
             # 计算RSI
@@ -45,14 +45,14 @@ class BacktraceMA250Strategy(BaseStrategy):
             self.logger.error(f"计算技术指标失败: {str(e)}")
             return None, None, None, None
             
-    def analyze(self, data):
+    def analyze(self, data, ctx=None):
         """分析数据"""
         try:
             if len(data) < self.ma_window:
                 return None
                 
             # 计算技术指标
-            ma250, deviation, volume_ratio, rsi = self.calculate_indicators(data)
+            ma250, deviation, volume_ratio, rsi = self.calculate_indicators(data, ctx)
             
             if any(x is None for x in [ma250, deviation, volume_ratio, rsi]):
                 return None
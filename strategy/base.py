@@ -9,14 +9,32 @@ class BaseStrategy:
         self.logger_manager = logger_manager or LoggerManager()
         self.logger = self.logger_manager.get_logger(self.__class__.__name__)
         
-    def analyze(self, data):
+    def analyze(self, data, ctx=None):
         """
         分析数据
         :param data: DataFrame 股票数据
+        :param ctx: dict 同一只股票各策略共享的指标缓存，为None时各自计算
         :return: dict 分析结果
         """
         raise NotImplementedError("子类必须实现analyze方法")
         
+    def _rolling_mean(self, data, column, window, ctx=None):
+        """
+        计算滚动均值，传入ctx时同一只股票的相同均线只计算一次
+        :param data: DataFrame 股票数据
+        :param column: str 列名
+        :param window: int 窗口大小
+        :param ctx: dict 共享指标缓存
+        :return: Series 滚动均值（共享结果，调用方不应原地修改）
+        """
+        if ctx is None:
+            return data[column].rolling(window=window).mean()
+        key = ('ma', column, window)
+        value = ctx.get(key)
+        if value is None:
+            value = ctx[key] = data[column].rolling(window=window).mean()
+        return value
+        
     def get_signals(self, data):
         """
         获取买卖信号
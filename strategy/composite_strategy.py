@@ -14,15 +14,15 @@ class CompositeStrategy(BaseStrategy):
         self.volume_ratio = 1.5  # 成交量放大倍数
         self.rsi_threshold = 50  # RSI阈值
         
-    def calculate_trend(self, data):
+    def calculate_trend(self, data, ctx=None):
         """计算趋势"""
         try:
             close = data['close']  # Changed from '收盘' to 'close'
             
             # 计算均线
-            ma5 = close.rolling(window=5).mean()
-            ma10 = close.rolling(window=10).mean()
-            ma20 = close.rolling(window=20).mean()
+            ma5 = self._rolling_mean(data, 'close', 5, ctx)
+            ma10 = self._rolling_mean(data, 'close', 10, ctx)
+            ma20 = self._rolling_mean(data, 'close', 20, ctx)
             
             # 判断趋势
             trend_up = (ma5 > ma10) & (ma10 > ma20)
@@ -79,14 +79,14 @@ class CompositeStrategy(BaseStrategy):
             self.logger.error(f"计算动量失败: {str(e)}")
             return None, None, None, None, None
             
-    def calculate_volume_analysis(self, data):
+    def calculate_volume_analysis(self, data, ctx=None):
         """计算量价分析"""
         try:
             close = data['close']  # Changed from '收盘' to 'close'
             volume = data['volume']  # Changed from '成交量' to 'volume'
             
             # 计算成交量变化
-            volume_ma = volume.rolling(window=20).mean()
+            volume_ma = self._rolling_mean(data, 'volume', 20, ctx)
             volume_ratio = volume / volume_ma
             
             # 计算量价关系
@@ -138,17 +138,17 @@ class CompositeStrategy(BaseStrategy):
             self.logger.error(f"计算波动率失败: {str(e)}")
             return None, None
             
-    def analyze(self, data):
+    def analyze(self, data, ctx=None):
         """分析数据"""
         try:
             if len(data) < self.window_size:
                 return None
                 
             # 计算各项指标
-            trend_up, trend_down = self.calculate_trend(data)
+            trend_up, trend_down = self.calculate_trend(data, ctx)
             support, resistance, upper, middle, lower = self.calculate_support_resistance(data)
             rsi, k, d, j, macd_hist = self.calculate_momentum(data)
-            volume_ratio, volume_price_corr = self.calculate_volume_analysis(data)
+            volume_ratio, volume_price_corr = self.calculate_volume_analysis(data, ctx)
             doji, hammer, engulfing = self.calculate_pattern_recognition(data)
             volatility, volume_volatility = self.calculate_volatility(data)
             
@@ -14,7 +14,7 @@ class EnterStrategy(BaseStrategy):
         self.volume_ratio = 1.5  # 成交量放大倍数
         self.price_change_threshold = 0.03  # 价格变化阈值
         
-    def analyze(self, data):
+    def analyze(self, data, ctx=None):
         """分析数据"""
         try:
             if len(data) < self.window_size + 1:
@@ -30,9 +30,9 @@ class EnterStrategy(BaseStrategy):
             second_last_close = data_prev['close'].iloc[-1]  # Changed from '收盘' to 'close'
             
             # 计算均线
-            ma5 = data['close'].rolling(window=5).mean()  # Changed from '收盘' to 'close'
-            ma10 = data['close'].rolling(window=10).mean()  # Changed from '收盘' to 'close'
-            ma20 = data['close'].rolling(window=20).mean()  # Changed from '收盘' to 'close'
+            ma5 = self._rolling_mean(data, 'close', 5, ctx)
+            ma10 = self._rolling_mean(data, 'close', 10, ctx)
+            ma20 = self._rolling_mean(data, 'close', 20, ctx)
             
             # 获取最近N天数据
             latest_data = data.tail(self.window_size)
@@ -38,7 +38,7 @@ class KeepIncreasingStrategy(BaseStrategy):
             self.logger.error(f"计算趋势失败: {str(e)}")
             return None, None, None, None
             
-    def analyze(self, data):
+    def analyze(self, data, ctx=None):
         """分析数据"""
         try:
             if len(data) < self.window_size:
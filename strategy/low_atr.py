@@ -37,7 +37,7 @@ class LowATRStrategy(BaseStrategy):
             print(f"计算ATR失败: {str(e)}")
             return None, None
             
-    def analyze(self, data):
+    def analyze(self, data, ctx=None):
         """分析数据"""
         try:
             if len(data) < max(self.atr_window, self.ma_window):
@@ -49,7 +49,7 @@ class LowATRStrategy(BaseStrategy):
                 return None
                 
             # 计算均线
-            ma20 = data['close'].rolling(window=self.ma_window).mean()
+            ma20 = self._rolling_mean(data, 'close', self.ma_window, ctx)
             
             # 获取最新数据
             latest_close = data['close'].iloc[-1]
@@ -57,7 +57,7 @@ class LowATRStrategy(BaseStrategy):
             latest_ma20 = ma20.iloc[-1]
             
             # 计算成交量比率
-            volume_ma = data['volume'].rolling(window=self.ma_window).mean()
+            volume_ma = self._rolling_mean(data, 'volume', self.ma_window, ctx)
             volume_ratio = data['volume'].iloc[-1] / volume_ma.iloc[-1]
             
             # 判断信号
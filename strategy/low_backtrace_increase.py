@@ -35,7 +35,7 @@ class LowBacktraceIncreaseStrategy(BaseStrategy):
             self.logger.error(f"计算涨幅失败: {str(e)}")
             return None, None
             
-    def analyze(self, data):
+    def analyze(self, data, ctx=None):
         """分析数据"""
         try:
             if len(data) < self.window_size:
@@ -52,7 +52,7 @@ class LowBacktraceIncreaseStrategy(BaseStrategy):
                 return None
                 
             # 计算均线
-            ma = data['close'].rolling(window=self.ma_window).mean()
+            ma = self._rolling_mean(data, 'close', self.ma_window, ctx)
             
             # 获取最新数据
             latest_close = data['close'].iloc[-1]
@@ -168,7 +168,7 @@ class ModularStrategy(BaseStrategy):
             self.logger.error(f"检查成交量和波动率失败: {str(e)}")
             return None
             
-    def analyze(self, data):
+    def analyze(self, data, ctx=None):
         """Analyze data and generate trading signals"""
         try:
             if not self._validate_data(data):
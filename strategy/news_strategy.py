@@ -5,6 +5,7 @@ import os
 import json
 import time
 from settings import NEWS_CACHE_DIR
+from utils import dump_json, load_json
 
 class NewsStrategy(BaseStrategy):
     """新闻分析策略 - 市场整体分析"""
@@ -138,9 +139,8 @@ class NewsStrategy(BaseStrategy):
                 cache_time = os.path.getmtime(self.cache_file)
                 if time.time() - cache_time < 7200:  # 2小时内的缓存有效
                     try:
-                        with open(self.cache_file, 'r', encoding='utf-8') as f:
-                            self.analysis_result = json.load(f)
-                            return True
+                        self.analysis_result = load_json(self.cache_file)
+                        return True
                     except json.JSONDecodeError:
                         self.logger.warning("缓存文件损坏，将重新分析")
             
@@ -162,8 +162,7 @@ class NewsStrategy(BaseStrategy):
                 
             # 保存缓存
             try:
-                with open(self.cache_file, 'w', encoding='utf-8') as f:
-                    json.dump(self.analysis_result, f, ensure_ascii=False, indent=2)
+                dump_json(self.analysis_result, self.cache_file)
             except Exception as e:
                 self.logger.error(f"保存新闻分析缓存失败: {str(e)}")
                 
@@ -174,7 +173,7 @@ class NewsStrategy(BaseStrategy):
             self.analysis_result = self._get_default_analysis()
             return True  # 返回True以继续执行其他策略
             
-    def analyze(self, data):
+    def analyze(self, data, ctx=None):
         """分析单个股票"""
         try:
             if not self.analysis_result:
@@ -96,7 +96,7 @@ class TurtleStrategy(BaseStrategy):
             'stop_loss_price': latest_price - (self.stop_loss_atr * latest_atr)
         }
         
-    def analyze(self, data):
+    def analyze(self, data, ctx=None):
         """分析数据"""
         try:
             # 验证数据
@@ -21,11 +21,12 @@ from strategy.news_strategy import NewsStrategy
 class StrategyAnalyzer():
     """策略分析器"""
     
-    def __init__(self, logger_manager=None):
+    def __init__(self, logger_manager=None, data_fetcher=None):
         super().__init__()
         self.logger_manager = logger_manager or LoggerManager()
         self.logger = self.logger_manager.get_logger("strategy_analyzer")
-        self.data_fetcher = DataFetcher(logger_manager=self.logger_manager)
+        # 可传入调用方已有的DataFetcher，共享其交易日缓存和限流状态
+        self.data_fetcher = data_fetcher or DataFetcher(logger_manager=self.logger_manager)
         
         # 初始化策略
         self.strategies = {
@@ -67,11 +68,27 @@ class StrategyAnalyzer():
             self.logger.error(f"执行全局新闻分析时发生错误: {str(e)}")
             return False
             
-    def analyze_stock(self, stock_code):
-        """分析单个股票"""
+    def get_news_analysis(self):
+        """返回全局新闻分析结果，未完成时返回None（用于传递给工作进程）"""
+        return self.news_strategy.analysis_result if self.news_analysis_result else None
+        
+    def set_news_analysis(self, analysis_result):
+        """直接使用已有的全局新闻分析结果，工作进程无需重新执行新闻分析"""
+        self.news_strategy.analysis_result = analysis_result
+        self.news_analysis_result = bool(analysis_result)
+        
+    def analyze_stock(self, stock_code, use_cache=False, timestamp=None):
+        """分析单个股票
+        
+        :param use_cache: 为True时直接使用本地缓存数据（数据已在预取阶段更新）
+        :param timestamp: 分析时间字符串，批量分析时由调用方统一传入，避免逐只格式化当前时间
+        """
         try:
             # 获取股票数据
-            stock_data = self.data_fetcher.get_stock_data(stock_code)
+            if use_cache:
+                stock_data = self.data_fetcher.load_cached_data(stock_code)
+            else:
+                stock_data = self.data_fetcher.get_stock_data(stock_code)
             if stock_data is None or stock_data.empty:
                 self.logger.warning(f"无法获取股票 {stock_code} 的数据")
                 return None
@@ -82,11 +99,15 @@ class StrategyAnalyzer():
                 self.logger.warning(f"股票 {stock_code} 的数据预处理失败")
                 return None
             
-            # 运行所有策略
+            # 预处理已生成副本，原始数据不再需要，提前释放以降低各工作进程的内存峰值
+            del stock_data
+            
+            # 运行所有策略，各策略共用的均线等指标通过ctx只计算一次
             strategy_results = {}
+            ctx = {}
             for strategy_name, strategy in self.strategies.items():
                 try:
-                    result = strategy.analyze(processed_data)
+                    result = strategy.analyze(processed_data, ctx=ctx)
                     if result:
                         strategy_results[strategy_name] = result
                 except Exception as e:
@@ -108,7 +129,7 @@ class StrategyAnalyzer():
             # 添加时间戳到分析结果
             analysis_result = {
                 'code': stock_code,
-                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'timestamp': timestamp or datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
                 'strategy_results': strategy_results,
                 'last_price': float(processed_data['close'].iloc[-1]),
                 'last_volume': float(processed_data['volume'].iloc[-1]),
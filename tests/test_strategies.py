@@ -269,5 +269,74 @@ class TestStrategies(unittest.TestCase):
             self.assertIn('strategy', signal)
             self.assertIn('price', signal)
 
+class TestRSRSVectorization(unittest.TestCase):
+    """测试RSRS向量化回归与逐窗口lstsq的结果一致"""
+    
+    window_size = 16
+    
+    @staticmethod
+    def reference_rsrs(data, window_size):
+        """逐窗口调用np.linalg.lstsq的参考实现"""
+        high = data['high'].values
+        low = data['low'].values
+        slopes = []
+        r2s = []
+        for i in range(len(data) - window_size + 1):
+            x = low[i:i+window_size]
+            y = high[i:i+window_size]
+            X = np.column_stack([np.ones_like(x), x])
+            try:
+                beta = np.linalg.lstsq(X, y, rcond=None)[0]
+                y_pred = np.dot(X, beta)
+                ss_tot = np.sum((y - y.mean()) ** 2)
+                ss_res = np.sum((y - y_pred) ** 2)
+                slopes.append(beta[1])
+                r2s.append(0 if ss_tot == 0 else 1 - ss_res / ss_tot)
+            except np.linalg.LinAlgError:
+                slopes.append(np.nan)
+                r2s.append(np.nan)
+        return np.array(slopes), np.array(r2s)
+        
+    def make_data(self, n=120, seed=0):
+        """生成带噪声的最高价/最低价序列"""
+        rng = np.random.default_rng(seed)
+        low = 100 + rng.normal(0, 1, n).cumsum()
+        high = low + np.abs(rng.normal(2, 1, n))
+        return pd.DataFrame({'high': high, 'low': low})
+        
+    def assert_matches_reference(self, data):
+        slopes, r2s = RSRS_Strategy().calculate_rsrs(data, self.window_size)
+        ref_slopes, ref_r2s = self.reference_rsrs(data, self.window_size)
+        np.testing.assert_allclose(slopes, ref_slopes, rtol=1e-7, atol=1e-9)
+        np.testing.assert_allclose(r2s, ref_r2s, rtol=1e-7, atol=1e-9)
+        
+    def test_noisy_data(self):
+        """带噪声的数据"""
+        for seed in range(5):
+            self.assert_matches_reference(self.make_data(seed=seed))
+            
+    def test_constant_low_window(self):
+        """最低价在窗口内不变（回归退化）"""
+        data = self.make_data()
+        data.loc[30:60, 'low'] = 95.0
+        self.assert_matches_reference(data)
+        
+    def test_nan_windows(self):
+        """含缺失值的窗口结果为NaN"""
+        data = self.make_data()
+        data.loc[40, 'low'] = np.nan
+        data.loc[80, 'high'] = np.nan
+        slopes, r2s = RSRS_Strategy().calculate_rsrs(data, self.window_size)
+        nan_windows = np.zeros(len(slopes), dtype=bool)
+        for row in (40, 80):
+            nan_windows[row - self.window_size + 1:row + 1] = True
+        self.assertTrue(np.isnan(slopes[nan_windows]).all())
+        self.assertTrue(np.isnan(r2s[nan_windows]).all())
+        
+        # 其余窗口与参考实现一致
+        ref_slopes, ref_r2s = self.reference_rsrs(data, self.window_size)
+        np.testing.assert_allclose(slopes[~nan_windows], ref_slopes[~nan_windows], rtol=1e-7, atol=1e-9)
+        np.testing.assert_allclose(r2s[~nan_windows], ref_r2s[~nan_windows], rtol=1e-7, atol=1e-9)
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,267 @@
+import os
+import sys
+import shutil
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils
+from work_flow import WorkFlow, CHECKPOINT_MAX_AGE, _checkpoint_masks
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def make_result(code, timestamp):
+    """构造一条检查点结果"""
+    return {
+        'code': code,
+        'name': f'股票{code}',
+        'buy_signals': 1,
+        'sell_signals': 0,
+        'strategies': ['RSRS_Strategy(买入)'],
+        'signal_details': [{'strategy': 'RSRS_Strategy', 'type': '买入', 'factors': {'slope': 1.2}, 'strength': 1}],
+        'data_date': '2024-01-02',
+        'timestamp': timestamp
+    }
+
+
+def row_wise_valid(code, result, current_codes, now):
+    """逐条校验检查点结果的参考实现（向量化之前的逻辑）"""
+    if code not in current_codes or 'timestamp' not in result:
+        return False
+    try:
+        timestamp = datetime.strptime(result['timestamp'], TIME_FORMAT)
+    except (TypeError, ValueError):
+        return False
+    return (now - timestamp).total_seconds() <= CHECKPOINT_MAX_AGE
+
+
+class TestJsonLines(unittest.TestCase):
+    """测试JSONL编码与解码"""
+
+    result = make_result('600000', '2024-01-02 15:30:00')
+
+    def assert_round_trip(self):
+        line = utils.dumps_json_line(self.result)
+        self.assertTrue(line.endswith(b'\n'))
+        self.assertEqual(line.count(b'\n'), 1)
+        self.assertEqual(utils.loads_json(line), self.result)
+
+    @unittest.skipIf(utils.orjson is None, "未安装orjson")
+    def test_round_trip_orjson(self):
+        """orjson编码后能原样解码"""
+        self.assert_round_trip()
+
+    def test_round_trip_stdlib(self):
+        """标准库json编码后能原样解码"""
+        with mock.patch.object(utils, 'orjson', None):
+            self.assert_round_trip()
+
+    def test_invalid_line_raises_value_error(self):
+        """不完整的行抛出ValueError"""
+        line = utils.dumps_json_line(self.result)[:-10]
+        with self.assertRaises(ValueError):
+            utils.loads_json(line)
+        with mock.patch.object(utils, 'orjson', None):
+            with self.assertRaises(ValueError):
+                utils.loads_json(line)
+
+
+class TestCheckpointValidation(unittest.TestCase):
+    """测试检查点向量化校验与逐条校验结果一致"""
+
+    def test_matches_row_wise(self):
+        now = datetime(2024, 1, 3, 12, 0, 0)
+        fresh = (now - timedelta(hours=1)).strftime(TIME_FORMAT)
+        stale = (now - timedelta(days=2)).strftime(TIME_FORMAT)
+        future = (now + timedelta(hours=1)).strftime(TIME_FORMAT)
+        boundary = (now - timedelta(seconds=CHECKPOINT_MAX_AGE)).strftime(TIME_FORMAT)
+        timestamps = [fresh, stale, future, boundary, None, 'invalid', 20240103, '', fresh]
+        codes = [f'6000{i:02d}' for i in range(len(timestamps))]
+        results = [{'code': code, 'timestamp': ts} for code, ts in zip(codes, timestamps)]
+        results.append({'code': '600099'})
+        codes.append('600099')
+        # 最后一只股票已不在当前列表中
+        current_codes = set(codes[:-2]) | {'600099'}
+
+        valid_mask, expired_mask = _checkpoint_masks(codes, results, current_codes, now=pd.Timestamp(now))
+        expected = [row_wise_valid(code, result, current_codes, now) for code, result in zip(codes, results)]
+        self.assertEqual(valid_mask.tolist(), expected)
+        self.assertEqual(expired_mask.tolist(), [code == codes[1] for code in codes])
+
+
+class TestCheckpointResume(unittest.TestCase):
+    """测试检查点的写入、加载与断点续传"""
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp_dir = tempfile.mkdtemp()
+        os.chdir(self.tmp_dir)
+
+        self.workflow = WorkFlow()
+        self.workflow.checkpoint_file = os.path.join(self.tmp_dir, 'checkpoint.jsonl')
+        self.workflow.data_fetcher.refresh_stock_data = lambda code: True
+        self.analyzed = []
+        self.workflow.strategy_analyzer.analyze_stock = self.fake_analyze_stock
+
+        self.stocks = [{'code': f'6000{i:02d}', 'name': f'股票{i}'} for i in range(10)]
+        now = datetime.now()
+        self.fresh = (now - timedelta(hours=1)).strftime(TIME_FORMAT)
+        self.stale = (now - timedelta(days=2)).strftime(TIME_FORMAT)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def fake_analyze_stock(self, stock_code, use_cache=False, timestamp=None):
+        self.analyzed.append(stock_code)
+        return {
+            'strategy_results': {'RSRS_Strategy': {'signal': '买入', 'factors': {'slope': 1.2}}},
+            'last_date': '2024-01-02',
+            'timestamp': timestamp
+        }
+
+    def write_checkpoint(self, lines):
+        with open(self.workflow.checkpoint_file, 'wb') as f:
+            for line in lines:
+                f.write(line)
+
+    def read_checkpoint_codes(self):
+        with open(self.workflow.checkpoint_file, 'rb') as f:
+            return [utils.loads_json(line)['code'] for line in f]
+
+    def test_load_skips_truncated_line(self):
+        """最后一行写了一半时跳过该行，同一股票保留最后一条结果"""
+        first = make_result('600000', self.stale)
+        second = make_result('600000', self.fresh)
+        self.write_checkpoint([
+            utils.dumps_json_line(first),
+            utils.dumps_json_line(make_result('600001', self.fresh)),
+            utils.dumps_json_line(second),
+            utils.dumps_json_line(make_result('600002', self.fresh))[:-20],
+        ])
+        codes, results = self.workflow._load_checkpoint()
+        self.assertEqual(codes, ['600000', '600001'])
+        self.assertEqual(results[0], second)
+
+    def test_atomic_rewrite(self):
+        """重写检查点后不残留临时文件"""
+        results = [make_result(stock['code'], self.fresh) for stock in self.stocks]
+        self.workflow._rewrite_checkpoint(results)
+        self.assertEqual(self.read_checkpoint_codes(), [stock['code'] for stock in self.stocks])
+        self.assertFalse([name for name in os.listdir(self.tmp_dir) if '.tmp.' in name])
+
+    def assert_resume(self):
+        self.write_checkpoint(
+            [utils.dumps_json_line(make_result(f'6000{i:02d}', self.fresh)) for i in range(5)]
+            + [utils.dumps_json_line(make_result('600005', self.stale)),
+               utils.dumps_json_line(make_result('699999', self.fresh)),
+               utils.dumps_json_line(make_result('600006', self.fresh))[:-20]]
+        )
+        self.assertEqual(self.workflow.analyze_stocks(self.stocks), 10)
+        # 过期、已移出列表以及写了一半的条目都会被重新分析或剔除
+        self.assertEqual(sorted(self.analyzed), [f'6000{i:02d}' for i in range(5, 10)])
+        self.assertEqual(sorted(self.read_checkpoint_codes()), [stock['code'] for stock in self.stocks])
+
+    def test_resume(self):
+        """从检查点恢复时只分析过期和未分析的股票"""
+        self.assert_resume()
+
+    def test_resume_stdlib_json(self):
+        """未安装orjson时检查点同样可以续传"""
+        with mock.patch.object(utils, 'orjson', None):
+            self.assert_resume()
+
+    def test_compact_when_all_analysed(self):
+        """所有股票都已分析完成时，检查点同样只保留有效结果"""
+        self.write_checkpoint(
+            [utils.dumps_json_line(make_result(stock['code'], self.fresh)) for stock in self.stocks]
+            + [utils.dumps_json_line(make_result('699999', self.fresh)),
+               utils.dumps_json_line(make_result('600000', self.fresh))]
+        )
+        self.assertEqual(self.workflow.analyze_stocks(self.stocks[:5]), 5)
+        self.assertEqual(self.analyzed, [])
+        self.assertEqual(sorted(self.read_checkpoint_codes()), [stock['code'] for stock in self.stocks[:5]])
+
+
+
+class TestPoolAnalysis(unittest.TestCase):
+    """测试进程池路径：预取线程交接、试运行测速与任务块大小"""
+
+    stock_count = 60
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp_dir = tempfile.mkdtemp()
+        os.chdir(self.tmp_dir)
+
+        self.workflow = WorkFlow()
+        self.workflow.checkpoint_file = os.path.join(self.tmp_dir, 'checkpoint.jsonl')
+        self.workflow.max_workers = 2
+        # 缓存已是最新，预取阶段不访问网络
+        self.workflow.data_fetcher.refresh_stock_data = lambda code: True
+
+        self.stocks = [{'code': f'{600000 + i:06d}', 'name': f'股票{i}'} for i in range(self.stock_count)]
+        for stock in self.stocks:
+            self.workflow.data_fetcher._save_cache(self.make_data(stock['code']), stock['code'])
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    @staticmethod
+    def make_data(code, n=300):
+        """生成一只股票的日线数据"""
+        rng = np.random.default_rng(int(code))
+        dates = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=n)
+        close = 10 + rng.normal(0, 0.2, n).cumsum()
+        return pd.DataFrame({
+            'open': close + rng.normal(0, 0.1, n),
+            'high': close + 0.3,
+            'low': close - 0.3,
+            'close': close,
+            'volume': rng.integers(100000, 1000000, n).astype(float),
+            'amount': 1.0
+        }, index=pd.Index(dates, name='date'))
+
+    def test_each_stock_analysed_once(self):
+        """缓存已是最新时每只股票只分析一次，且试运行测得的耗时不包含进程启动"""
+        self.assertGreater(self.stock_count, self.workflow.min_pool_size)
+
+        # 在当前进程中测出单只股票的分析耗时作为参照
+        start_time = time.process_time()
+        for stock in self.stocks[:5]:
+            self.workflow.strategy_analyzer.analyze_stock(stock['code'], use_cache=True)
+        reference = (time.process_time() - start_time) / 5
+
+        chosen = {}
+        choose_chunksize = self.workflow._choose_chunksize
+
+        def record_chunksize(seconds_per_stock, remaining):
+            chosen['seconds_per_stock'] = seconds_per_stock
+            chosen['chunksize'] = choose_chunksize(seconds_per_stock, remaining)
+            return chosen['chunksize']
+
+        self.workflow._choose_chunksize = record_chunksize
+        self.assertEqual(self.workflow.analyze_stocks(self.stocks), self.stock_count)
+
+        with open(self.workflow.checkpoint_file, 'rb') as f:
+            codes = [utils.loads_json(line)['code'] for line in f]
+        self.assertEqual(sorted(codes), [stock['code'] for stock in self.stocks])
+
+        # 进入了进程池路径并完成了试运行，测得的耗时与当前进程中的分析耗时相当
+        self.assertIn('chunksize', chosen)
+        self.assertLess(chosen['seconds_per_stock'], reference * 3)
+        self.assertGreater(chosen['chunksize'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
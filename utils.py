@@ -1,15 +1,52 @@
 # -*- coding: UTF-8 -*-
 import datetime
+import functools
 import akshare as ak
+import pandas as pd
 from logger_manager import LoggerManager
 import os
 import time
 import json
-import traceback
 from colorama import Fore, Style
 
+# orjson为可选依赖，用于加速JSON读写
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logger = LoggerManager().get_logger("utils")
 
+def dumps_json(obj):
+    """把对象编码为JSON字节串（缩进2格，中文不转义），优先使用orjson"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS
+                            | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, ensure_ascii=False, indent=2).encode('utf-8')
+
+def dumps_json_line(obj):
+    """把对象编码为以换行结尾的单行JSON字节串（JSONL的一行）"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+                            | orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(obj, ensure_ascii=False) + '\n').encode('utf-8')
+
+def loads_json(data):
+    """解析JSON字节串，格式无效时抛出ValueError（json.JSONDecodeError）"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def dump_json(obj, path):
+    """写入JSON文件"""
+    with open(path, 'wb') as f:
+        f.write(dumps_json(obj))
+
+def load_json(path):
+    """读取JSON文件，格式无效时抛出json.JSONDecodeError"""
+    with open(path, 'rb') as f:
+        return loads_json(f.read())
+
 def is_weekday():
     """是否是工作日"""
     return datetime.datetime.today().weekday() < 5
@@ -144,8 +181,7 @@ A股列表获取成功:
             
         except Exception as e:
             print(f"获取股票列表失败 (尝试 {attempt + 1}/{max_retries}): {str(e)}")
-            logger.error(f"获取股票列表失败 (尝试 {attempt + 1}/{max_retries}): {str(e)}")
-            logger.error(traceback.format_exc())
+            logger.exception(f"获取股票列表失败 (尝试 {attempt + 1}/{max_retries}): {str(e)}")
             if attempt < max_retries - 1:
                 time.sleep(retry_delay * (2 ** attempt))  # 指数退避
             else:
@@ -328,8 +364,7 @@ def save_analysis_result(result, code):
         }
         
         # 保存结果
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(result, f, indent=2, ensure_ascii=False)
+        dump_json(result, filename)
             
         return filename
         
@@ -337,44 +372,75 @@ def save_analysis_result(result, code):
         print(f"保存分析结果时出错: {str(e)}")
         return None
 
+# 股票名称字典的缓存有效期（秒）
+STOCK_NAMES_TTL = 3600
+
+@functools.lru_cache(maxsize=1)
+def _load_stock_name_dict(ttl_bucket):
+    """从接口获取股票代码到名称的映射（成功结果会被缓存，异常不会被缓存）
+    
+    :param ttl_bucket: 时间分段编号，进入下一个时间段后缓存自动失效
+    """
+    logger.info("开始获取股票名称字典...")
+    
+    # 获取所有A股列表
+    stock_info = ak.stock_zh_a_spot_em()
+    
+    if stock_info is None or stock_info.empty:
+        raise ValueError("返回数据为空")
+        
+    # 只保留股票代码和名称
+    stock_info = stock_info[['代码', '名称']]
+    
+    # 转换为字典格式
+    stock_dict = dict(zip(stock_info['代码'], stock_info['名称']))
+    
+    logger.info(f"成功获取 {len(stock_dict)} 只股票的名称信息")
+    
+    return stock_dict
+
 def get_stock_name_dict():
-    """获取股票代码到名称的映射字典"""
+    """获取股票代码到名称的映射字典（进程内缓存，调用方不应修改返回的字典）"""
     try:
-        logger.info("开始获取股票名称字典...")
-        
-        # 获取所有A股列表
-        stock_info = ak.stock_zh_a_spot_em()
-        
-        if stock_info is None or stock_info.empty:
-            logger.error("获取股票名称字典失败：返回数据为空")
-            return {}
-            
-        # 只保留股票代码和名称
-        stock_info = stock_info[['代码', '名称']]
-        
-        # 转换为字典格式
-        stock_dict = dict(zip(stock_info['代码'], stock_info['名称']))
-        
-        logger.info(f"成功获取 {len(stock_dict)} 只股票的名称信息")
-        
-        return stock_dict
+        return _load_stock_name_dict(int(time.time() // STOCK_NAMES_TTL))
         
     except Exception as e:
-        logger.error(f"获取股票名称字典失败: {str(e)}")
-        logger.error(traceback.format_exc())
+        logger.exception(f"获取股票名称字典失败: {str(e)}")
         return {}
 
-def get_stock_info():
-    """获取A股列表（已剔除ST、退市、科创板和北交所股票）"""
+def invalidate_stock_names():
+    """清除股票名称字典缓存，下次调用get_stock_name_dict时重新获取"""
+    _load_stock_name_dict.cache_clear()
+
+def get_traded_codes(stock_info):
+    """从实时行情快照中取出当天已有成交的股票代码集合，用于剔除停牌股票
+    
+    开盘前所有股票成交量都为0，此时无法区分停牌，返回None表示不做过滤；快照无效时同样返回None
+    """
+    if stock_info is None or stock_info.empty or '成交量' not in stock_info.columns:
+        return None
+    traded = pd.to_numeric(stock_info['成交量'], errors='coerce') > 0
+    if not traded.any():
+        return None
+    return set(stock_info.loc[traded, '代码'])
+
+def get_stock_info(spot=None):
+    """获取A股列表（已剔除ST、退市、科创板和北交所股票）
+    
+    :param spot: 已获取的实时行情快照（ak.stock_zh_a_spot_em的结果），传入时不再重复请求接口
+    """
     logger = LoggerManager().get_logger("utils")
     max_retries = 3
     retry_delay = 0.1
     
     for attempt in range(max_retries):
 
-        print(f"{Fore.CYAN}正在从接口获取股票列表...{Style.RESET_ALL}")
         # 获取股票列表
-        stock_info = ak.stock_zh_a_spot_em()
+        if spot is not None:
+            stock_info = spot
+        else:
+            print(f"{Fore.CYAN}正在从接口获取股票列表...{Style.RESET_ALL}")
+            stock_info = ak.stock_zh_a_spot_em()
             
         if stock_info is None or stock_info.empty:
             raise ValueError("获取到的股票列表为空")
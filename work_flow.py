@@ -1,44 +1,164 @@
 # -*- encoding: UTF-8 -*-
 
 import os
-import json
+import sys
+import shutil
+from functools import cached_property
+import asyncio
+import queue
+import itertools
+import threading
+import numpy as np
 import pandas as pd
 from datetime import datetime
 from data_fetcher import DataFetcher
 from strategy_analyzer import StrategyAnalyzer
 from logger_manager import LoggerManager
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
+import multiprocessing
+from contextlib import ExitStack
 import time
-import traceback
+import logging
 from tqdm import tqdm
 from colorama import init, Fore, Style
 import utils
-from settings import ANALYSIS_CACHE_DIR
+from settings import ANALYSIS_CACHE_DIR, REQUEST_RATE_LIMIT
+
+# pyarrow为可选依赖，用于加速CSV/Parquet导出
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+except ImportError:
+    pa = None
 
 # 初始化colorama，确保在Windows上也能正常显示颜色
 init(autoreset=True)
 
-def process_stock_data(args):
-    """处理单个股票数据的线程函数"""
-    stock, logger_manager = args
-    logger = logger_manager.get_logger("process_stock")
+# 信号类型 -> (计数字段, 强度字段)，用一次字典查找代替逐个字符串比较
+_SIGNAL_FIELDS = {
+    '买入': ('buy_signals', 'buy_strength'),
+    '卖出': ('sell_signals', 'sell_strength'),
+}
+
+# (策略名, 信号) -> 触发策略标签，如"RSRS_Strategy(买入)"；组合有限，缓存后各股票复用同一字符串
+_STRATEGY_LABELS = {}
+
+# 汇总报告的列顺序
+REPORT_COLUMNS = ['股票代码', '股票名称', '买入信号数', '卖出信号数', '触发策略', '数据日期', '来源']
+
+# 工作进程内的常驻对象，由_init_worker在进程启动时初始化一次
+_WORKER = {}
+
+# 工作进程内已记录过完整堆栈的异常类型
+_SEEN_EXCEPTIONS = set()
+
+def _init_worker(logger_manager, run_time, news_analysis=None, strategy_analyzer=None):
+    """工作进程初始化函数（单进程执行时传入已有的strategy_analyzer直接复用）
+    
+    :param run_time: 本次分析的时间戳，所有股票的结果统一使用该时间
+    :param news_analysis: 主进程的全局新闻分析结果，工作进程与单进程执行使用同一份结果
+    """
+    # spawn方式启动的子进程不会继承父进程的日志处理器
+    if not logging.getLogger().handlers:
+        logger_manager.setup_logging()
+    _WORKER['logger_manager'] = logger_manager
+    _WORKER['logger'] = logger_manager.get_logger("process_stock")
+    analyzer = strategy_analyzer or StrategyAnalyzer(logger_manager=logger_manager)
+    analyzer.set_news_analysis(news_analysis)
+    _WORKER['analyzer'] = analyzer
+    _WORKER['run_time'] = run_time
+
+def _pool_context():
+    """进程池的启动方式：优先forkserver，不支持时使用spawn
+    
+    进程池在预取线程运行期间启动，且maxtasksperchild会不断重建工作进程；此时直接fork
+    可能复制其他线程正持有的锁导致子进程死锁，因此不使用fork方式
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context('forkserver')
+        # 预先在forkserver中导入本模块，之后每个工作进程fork时无需重新导入策略等依赖
+        ctx.set_forkserver_preload([__name__])
+        return ctx
+    return multiprocessing.get_context('spawn')
+
+# 文件写入缓冲区大小（检查点、CSV导出）
+WRITE_BUFFER_SIZE = 256 * 1024
+
+def _atomic_write(path, chunks):
+    """先写入临时文件并落盘，再原子替换目标文件，崩溃时不会留下写了一半的文件"""
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, 'wb', buffering=WRITE_BUFFER_SIZE) as f:
+        for chunk in chunks:
+            f.write(chunk)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def _atomic_write_json(path, obj):
+    """原子写入JSON文件（缩进2格，中文不转义）"""
+    _atomic_write(path, (utils.dumps_json(obj),))
+
+# 无法确定股票名称时使用的占位名称
+UNKNOWN_NAME = "Unknown"
+
+def _write_csv(df, path):
+    """写出CSV（带BOM以便Excel识别），优先使用pyarrow的C++写入器"""
+    if pa is None:
+        df.to_csv(path, index=False, encoding='utf-8-sig')
+        return
+    with open(path, 'wb', buffering=WRITE_BUFFER_SIZE) as f:
+        f.write(b'\xef\xbb\xbf')
+        pacsv.write_csv(pa.Table.from_pandas(df, preserve_index=False), f,
+                        write_options=pacsv.WriteOptions(batch_size=4096))
+
+def _write_parquet(df, path):
+    """写出zstd压缩的Parquet文件（pyarrow为可选依赖，未安装时改为写出同名CSV）"""
+    if pa is None:
+        _write_csv(df, os.path.splitext(path)[0] + '.csv')
+        return
+    df.to_parquet(path, index=False, compression='zstd')
+
+# 检查点结果的有效期（秒）
+CHECKPOINT_MAX_AGE = 24 * 60 * 60
+
+def _checkpoint_masks(codes, results, current_codes, now=None):
+    """一次性向量化校验检查点结果，返回(有效, 已过期)两个布尔数组
+    
+    结果有效：股票仍在当前列表中，且时间戳能按'%Y-%m-%d %H:%M:%S'解析、距今不超过CHECKPOINT_MAX_AGE秒；
+    缺失或格式无效的时间戳解析为NaT，参与比较时结果为False，会被一并剔除
+    """
+    codes = np.array(codes, dtype=object)
+    timestamps = pd.to_datetime(
+        pd.Series([r.get('timestamp') for r in results], dtype=object),
+        format='%Y-%m-%d %H:%M:%S',
+        errors='coerce'
+    )
+    age = ((now or pd.Timestamp.now()) - timestamps).dt.total_seconds().to_numpy()
+    in_current = np.isin(codes, list(current_codes))
+    return in_current & (age <= CHECKPOINT_MAX_AGE), in_current & (age > CHECKPOINT_MAX_AGE)
+
+def _normalize_stock(stock):
+    """把股票统一为(code, name)元组"""
+    if isinstance(stock, dict):
+        return stock['code'], stock['name']
+    if isinstance(stock, (list, tuple)):
+        return stock[0], stock[1]
+    return str(stock), UNKNOWN_NAME
+
+def process_stock_data(stock):
+    """处理单个股票数据的工作进程函数
+    
+    :param stock: (code, name)元组；日志和分析器等常驻对象由_init_worker提供，不随任务传输
+    """
+    logger = _WORKER['logger']
+    code, name = stock
     
     try:
-        strategy_analyzer = StrategyAnalyzer(logger_manager=logger_manager)
+        strategy_analyzer = _WORKER['analyzer']
         
-        # 处理股票代码和名称
-        if isinstance(stock, dict):
-            code = stock['code']
-            name = stock['name']
-        elif isinstance(stock, (list, tuple)):
-            code = stock[0]
-            name = stock[1]
-        else:
-            code = str(stock)
-            name = "Unknown"
-            
         # 分析数据
-        result = strategy_analyzer.analyze_stock(code)
+        # 数据已在预取阶段写入缓存，这里直接读取缓存
+        result = strategy_analyzer.analyze_stock(code, use_cache=True, timestamp=_WORKER['run_time'])
         
         if result and 'strategy_results' in result:
             # 预处理结果
@@ -49,102 +169,249 @@ def process_stock_data(args):
                 'sell_signals': 0,
                 'strategies': [],
                 'signal_details': [],
-                'data_date': result.get('last_date', '')
+                'data_date': result.get('last_date', ''),
+                'timestamp': result.get('timestamp', '')
             }
             
             # 统计买入卖出信号
+            strategies = processed_result['strategies']
+            signal_details = processed_result['signal_details']
             for strategy_name, strategy_result in result['strategy_results'].items():
-                if isinstance(strategy_result, dict) and 'signal' in strategy_result:
-                    signal = strategy_result['signal']
-                    if signal == '买入':
-                        processed_result['buy_signals'] += 1
-                        processed_result['strategies'].append(f"{strategy_name}(买入)")
-                        processed_result['signal_details'].append({
-                            'strategy': strategy_name,
-                            'type': '买入',
-                            'factors': strategy_result.get('factors', {}),
-                            'strength': strategy_result.get('buy_strength', 1)
-                        })
-                    elif signal == '卖出':
-                        processed_result['sell_signals'] += 1
-                        processed_result['strategies'].append(f"{strategy_name}(卖出)")
-                        processed_result['signal_details'].append({
-                            'strategy': strategy_name,
-                            'type': '卖出',
-                            'factors': strategy_result.get('factors', {}),
-                            'strength': strategy_result.get('sell_strength', 1)
-                        })
+                if not isinstance(strategy_result, dict):
+                    continue
+                signal = strategy_result.get('signal')
+                fields = _SIGNAL_FIELDS.get(signal)
+                if fields is None:
+                    continue
+                count_key, strength_key = fields
+                processed_result[count_key] += 1
+                label = _STRATEGY_LABELS.get((strategy_name, signal))
+                if label is None:
+                    label = _STRATEGY_LABELS[strategy_name, signal] = f"{strategy_name}({signal})"
+                strategies.append(label)
+                # 仅在策略没有因子时才创建空字典，而不是每次都预先构造默认值
+                signal_details.append({
+                    'strategy': strategy_name,
+                    'type': signal,
+                    'factors': strategy_result.get('factors') or {},
+                    'strength': strategy_result.get(strength_key, 1)
+                })
             
             return processed_result
             
         return None
         
     except Exception as e:
-        logger.error(f"处理股票 {code} 时出错: {str(e)}")
-        logger.error(traceback.format_exc())
+        # 每种异常类型只记录一次完整堆栈，大面积失败时避免重复格式化堆栈和日志膨胀
+        exc_type = type(e).__name__
+        if exc_type in _SEEN_EXCEPTIONS:
+            logger.error(f"处理股票 {code} 时出错: {exc_type}: {str(e)}")
+        else:
+            _SEEN_EXCEPTIONS.add(exc_type)
+            logger.exception(f"处理股票 {code} 时出错: {str(e)}")
         return None
 
+def _timed_process_stock_data(stock):
+    """在工作进程内计时的process_stock_data，返回(分析耗时秒数, 结果)，供试运行阶段测量单只耗时
+    
+    使用进程CPU时间，工作进程数多于CPU核数时也不会把等待调度的时间算作分析耗时
+    """
+    start_time = time.process_time()
+    result = process_stock_data(stock)
+    return time.process_time() - start_time, result
+
 class WorkFlow:
     """工作流程类"""
     def __init__(self, logger_manager=None):
         self.logger_manager = logger_manager or LoggerManager()
         self.logger = self.logger_manager.get_logger("workflow")
         self.data_fetcher = DataFetcher(logger_manager=self.logger_manager)
-        self.strategy_analyzer = StrategyAnalyzer(logger_manager=self.logger_manager)
-        self.analysis_results = []
-        self.stock_names = utils.get_stock_name_dict()
+        self.strategy_analyzer = StrategyAnalyzer(logger_manager=self.logger_manager,
+                                                  data_fetcher=self.data_fetcher)
+        # 完整结果只逐条写入检查点文件，内存中仅保留汇总报告所需的列
+        self._report_columns = {col: [] for col in REPORT_COLUMNS}
         
         # 性能优化参数
-        self.max_workers = min(64, (os.cpu_count() or 1) * 8)  # 线程数
-        self.batch_size = 200  # 批处理大小
+        self.max_workers = os.cpu_count() or 1  # 策略分析进程数
+        self.min_pool_size = 8  # 股票数少于该值时不启动进程池
+        self.max_tasks_per_child = 20  # 工作进程处理该数量的任务块后重建，限制内存增长
+        self.max_chunksize = 16  # 每个任务块的股票数上限
+        self.probe_tasks_per_worker = 4  # 试运行阶段每个工作进程分到的股票数，用于测量单只耗时
+        self.checkpoint_interval = 50  # 检查点保存间隔（只）
+        # 数据预取并发数：每个请求耗时不超过1秒时，足以跑满限流速率而不会有线程长期阻塞在限流上
+        self.prefetch_concurrency = max(1, int(REQUEST_RATE_LIMIT))
+        self.report_format = 'xlsx'  # 表格报告格式：xlsx、csv 或 parquet（后两者写入明显更快）
+        # 输出重定向到文件（定时任务、CI）时不显示进度条，避免刷新开销和日志膨胀
+        self.show_progress = sys.stderr.isatty()
+        self.progress_mininterval = 0.5  # 进度条最短刷新间隔（秒）
         
         # 缓存和断点相关
         self.cache_dir = ANALYSIS_CACHE_DIR
-        self.checkpoint_file = os.path.join(self.cache_dir, 'checkpoint.json')
+        self.checkpoint_file = os.path.join(self.cache_dir, 'checkpoint.jsonl')
         os.makedirs(self.cache_dir, exist_ok=True)
 
-    def _save_checkpoint(self, processed_stocks, results):
-        """保存分析检查点"""
-        try:
-            checkpoint_data = {
-                'timestamp': datetime.now().strftime('%Y%m%d_%H%M%S'),
-                'processed_stocks': processed_stocks,
-                'results': results
-            }
-            with open(self.checkpoint_file, 'w', encoding='utf-8') as f:
-                json.dump(checkpoint_data, f, ensure_ascii=False, indent=2)
-            self.logger.info(f"保存检查点成功: {len(processed_stocks)} 只股票")
-        except Exception as e:
-            self.logger.error(f"保存检查点失败: {str(e)}")
+    @cached_property
+    def stock_names(self):
+        """股票代码到名称的映射（首次使用时才获取，股票列表自带名称时无需请求接口）"""
+        return utils.get_stock_name_dict()
+
+    @property
+    def result_count(self):
+        """已完成分析的股票数量"""
+        return len(self._report_columns['股票代码'])
+
+    def _set_results(self, results):
+        """重置汇总报告列数据"""
+        self._report_columns = {col: [] for col in REPORT_COLUMNS}
+        for result in results:
+            self._add_result(result)
+
+    def _add_result(self, result):
+        """按列(SoA)记录一条分析结果中汇总报告所需的字段"""
+        columns = self._report_columns
+        columns['股票代码'].append(result.get('code', ''))
+        columns['股票名称'].append(result.get('name', ''))
+        columns['买入信号数'].append(result.get('buy_signals', 0))
+        columns['卖出信号数'].append(result.get('sell_signals', 0))
+        # 触发策略组合和数据日期在大量股票间重复，驻留后各行共用同一字符串对象
+        columns['触发策略'].append(sys.intern(','.join(result.get('strategies', ()))))
+        columns['数据日期'].append(sys.intern(result.get('data_date') or ''))
+        columns['来源'].append('缓存' if result.get('from_cache', False) else '实时')
+
+    def _rewrite_checkpoint(self, results):
+        """用仍然有效的结果重写检查点，剔除过期、已移出列表和重复的条目"""
+        _atomic_write(self.checkpoint_file, (utils.dumps_json_line(result) for result in results))
+
+    def _open_checkpoint(self):
+        """以追加模式打开检查点，供后续逐条写入"""
+        return open(self.checkpoint_file, 'ab', buffering=WRITE_BUFFER_SIZE)
 
     def _load_checkpoint(self):
-        """加载分析检查点"""
+        """加载分析检查点（JSONL格式，每行一只股票的分析结果）"""
         try:
-            if os.path.exists(self.checkpoint_file):
-                with open(self.checkpoint_file, 'r', encoding='utf-8') as f:
-                    checkpoint_data = json.load(f)
-                    
-                # 检查检查点时效性（24小时）
-                if 'timestamp' not in checkpoint_data:
-                    self.logger.info("检查点数据格式无效，将重新开始分析")
-                    return [], []
-                    
-                checkpoint_time = datetime.strptime(checkpoint_data['timestamp'], '%Y%m%d_%H%M%S')
-                if (datetime.now() - checkpoint_time).total_seconds() > 24 * 60 * 60:
-                    self.logger.info("检查点已过期，将重新开始分析")
-                    return [], []
-                    
-                self.logger.info(f"加载检查点成功: {len(checkpoint_data['processed_stocks'])} 只股票")
-                return checkpoint_data['processed_stocks'], checkpoint_data['results']
-            return [], []
+            # 同一股票可能被重复分析，保留最后一条结果
+            latest_results = {}
+            try:
+                f = open(self.checkpoint_file, 'rb')
+            except FileNotFoundError:
+                return [], []
+            with f:
+                for line in f:
+                    try:
+                        result = utils.loads_json(line)
+                    except ValueError:
+                        # 写入中途崩溃时最后一行可能不完整，跳过即可
+                        continue
+                    if isinstance(result, dict) and 'code' in result:
+                        latest_results[result['code']] = result
+                        
+            self.logger.info(f"加载检查点成功: {len(latest_results)} 只股票")
+            return list(latest_results.keys()), list(latest_results.values())
         except Exception as e:
             self.logger.error(f"加载检查点失败: {str(e)}")
             return [], []
 
+    async def _fetch_all(self, stocks, on_fetched=None, stop_event=None):
+        """使用asyncio并发获取股票数据，返回成功获取的数量；每只股票获取结束后回调on_fetched
+        
+        :param stop_event: 设置后不再发起新的请求（分析被中断时尽快结束预取）
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.prefetch_concurrency)
+        fetched_count = 0
+        
+        with ThreadPoolExecutor(max_workers=self.prefetch_concurrency) as executor:
+            async def fetch_one(stock):
+                async with semaphore:
+                    if stop_event is not None and stop_event.is_set():
+                        return stock, False
+                    # 只更新缓存不读取数据，分析阶段会再从缓存读取
+                    fetched = await loop.run_in_executor(executor, self.data_fetcher.refresh_stock_data, stock[0])
+                    return stock, fetched
+                    
+            with tqdm(total=len(stocks), desc=f"{Fore.BLUE}数据预取{Style.RESET_ALL}",
+                      ncols=100, unit="只", position=1, leave=False,
+                      mininterval=self.progress_mininterval,
+                      disable=not self.show_progress) as progress_bar:
+                for task in asyncio.as_completed([fetch_one(stock) for stock in stocks]):
+                    stock, fetched = await task
+                    if fetched:
+                        fetched_count += 1
+                    if on_fetched is not None:
+                        on_fetched(stock)
+                    progress_bar.update(1)
+                    
+        return fetched_count
+        
+    def _prefetch_stock_data(self, stocks, on_fetched=None, stop_event=None):
+        """预取阶段：用线程并发完成I/O密集的数据获取，CPU密集的策略分析交给进程池"""
+        try:
+            start_time = time.time()
+            fetched_count = asyncio.run(self._fetch_all(stocks, on_fetched, stop_event))
+            self.logger.info(
+                f"数据预取完成: {fetched_count}/{len(stocks)} 只股票, 用时 {time.time() - start_time:.1f}秒"
+            )
+        except Exception as e:
+            self.logger.exception(f"数据预取失败: {str(e)}")
+
+    def _iter_fetched_stocks(self, stocks, stop_event=None):
+        """在后台线程中预取数据，按获取完成的顺序逐只产出股票，使分析与数据获取同时进行"""
+        fetched = queue.Queue()
+        
+        def produce():
+            try:
+                self._prefetch_stock_data(stocks, on_fetched=fetched.put, stop_event=stop_event)
+            finally:
+                fetched.put(None)
+                
+        producer = threading.Thread(target=produce, name="prefetch", daemon=True)
+        producer.start()
+        
+        yielded = set()
+        while True:
+            stock = fetched.get()
+            if stock is None:
+                break
+            yielded.add(stock)
+            yield stock
+        producer.join()
+        
+        # 预取中途出错时，剩余股票仍交给分析阶段，由其直接读取已有缓存
+        for stock in stocks:
+            if stock not in yielded:
+                yield stock
+
+    def _choose_chunksize(self, seconds_per_stock, remaining):
+        """根据实测的单只股票分析耗时选择任务块大小"""
+        if seconds_per_stock < 0.05:
+            # 分析很快：进程间通信占比高，用最大的任务块
+            return self.max_chunksize
+        if seconds_per_stock > 1:
+            # 分析很慢：逐只提交，各工作进程的负载最均衡
+            return 1
+        return min(self.max_chunksize, max(1, remaining // (self.max_workers * 8)))
+
+    def _pool_results(self, pool, stocks, total_stocks):
+        """在进程池中分析股票：先逐只试运行一小批测出单只耗时，再据此确定其余股票的任务块大小"""
+        probe_size = min(total_stocks, self.max_workers * self.probe_tasks_per_worker)
+        # 耗时在工作进程内测量，不包含工作进程启动和等待预取的时间
+        busy_time = 0.0
+        probed = 0
+        for elapsed, result in pool.imap_unordered(_timed_process_stock_data,
+                                                   itertools.islice(stocks, probe_size)):
+            busy_time += elapsed
+            probed += 1
+            yield result
+            
+        seconds_per_stock = busy_time / max(probed, 1)
+        chunksize = self._choose_chunksize(seconds_per_stock, total_stocks - probe_size)
+        self.logger.debug(f"单只股票平均耗时 {seconds_per_stock:.3f}秒，任务块大小设为 {chunksize}")
+        yield from pool.imap_unordered(process_stock_data, stocks, chunksize=chunksize)
+
     def generate_summary_report(self):
         """生成分析汇总报告"""
         try:
-            if not self.analysis_results:
+            if not self.result_count:
                 self.logger.warning("没有分析结果可供生成报告")
                 return False
 
@@ -155,12 +422,19 @@ class WorkFlow:
             
             # 生成报告文件名
             report_file = os.path.join(report_dir, f'analysis_report_{timestamp}.json')
-            excel_file = os.path.join(report_dir, f'analysis_report_{timestamp}.xlsx')
+            results_file = os.path.join(report_dir, f'analysis_results_{timestamp}.jsonl')
+            table_file = os.path.join(report_dir, f'analysis_report_{timestamp}.{self.report_format}')
+            
+            # 按列构建报告数据
+            columns = self._report_columns
+            # 信号数不会超过策略数量，int16足够
+            buy_col = np.asarray(columns['买入信号数'], dtype=np.int16)
+            sell_col = np.asarray(columns['卖出信号数'], dtype=np.int16)
             
             # 统计信息
-            total_stocks = len(self.analysis_results)
-            buy_signals = sum(1 for r in self.analysis_results if r and r.get('buy_signals', 0) > 0)
-            sell_signals = sum(1 for r in self.analysis_results if r and r.get('sell_signals', 0) > 0)
+            total_stocks = self.result_count
+            buy_signals = int((buy_col > 0).sum())
+            sell_signals = int((sell_col > 0).sum())
             
             # 创建��总数据
             summary = {
@@ -168,46 +442,51 @@ class WorkFlow:
                 'total_stocks': total_stocks,
                 'buy_signals': buy_signals,
                 'sell_signals': sell_signals,
-                'results': self.analysis_results
+                # 完整结果另存为JSONL（每行一只股票），不再以缩进格式内嵌在汇总报告中
+                'results_file': results_file
             }
             
+            # 检查点已按行保存了本次全部有效结果，直接复制即可，无需解析后重新序列化
+            shutil.copyfile(self.checkpoint_file, results_file)
+            
             # 保存JSON格式报告
-            with open(report_file, 'w', encoding='utf-8') as f:
-                json.dump(summary, f, ensure_ascii=False, indent=2)
+            _atomic_write_json(report_file, summary)
                 
-            # 创建Excel格式报告
-            df_data = []
-            for result in self.analysis_results:
-                if result:
-                    row = {
-                        '股票代码': result.get('code', ''),
-                        '股票名称': result.get('name', ''),
-                        '买入信号数': result.get('buy_signals', 0),
-                        '卖出信号数': result.get('sell_signals', 0),
-                        '触发策略': ','.join(result.get('strategies', [])),
-                        '数据日期': result.get('data_date', ''),
-                        '来源': '缓存' if result.get('from_cache', False) else '实时'
-                    }
-                    df_data.append(row)
-                    
-            # 保存Excel报告
-            if df_data:
-                df = pd.DataFrame(df_data)
-                df.to_excel(excel_file, index=False)
+            # 创建表格报告：直接由列数据构建，无需逐行转换
+            if total_stocks:
+                df = pd.DataFrame({**columns, '买入信号数': buy_col, '卖出信号数': sell_col},
+                                  columns=REPORT_COLUMNS)
+                # 进程池按完成顺序返回结果，这里一次排序得到稳定的排名：买入信号多、卖出信号少的靠前
+                df.sort_values(['买入信号数', '卖出信号数'], ascending=[False, True],
+                               kind='stable', inplace=True, ignore_index=True)
+                if self.report_format == 'csv':
+                    _write_csv(df, table_file)
+                elif self.report_format == 'parquet':
+                    _write_parquet(df, table_file)
+                else:
+                    df.to_excel(table_file, index=False)
                 
             self.logger.info(f"生成分析报告成功: {report_file}")
             return True
             
         except Exception as e:
-            self.logger.error(f"生成分析报告失败: {str(e)}")
-            self.logger.error(traceback.format_exc())
+            self.logger.exception(f"生成分析报告失败: {str(e)}")
             return False
 
     def analyze_stocks(self, stock_list):
-        """分析股票列表"""
+        """分析股票列表，返回成功分析的股票数量"""
         try:
+            # 统一股票格式为(code, name)，工作进程无需再判断类型
+            stock_list = [_normalize_stock(stock) for stock in stock_list]
+            
+            # 名称缺失的股票在此补全，分析结果直接携带名称，生成报告时无需再按代码映射
+            stock_list = [
+                (code, self.stock_names.get(code, name)) if name == UNKNOWN_NAME else (code, name)
+                for code, name in stock_list
+            ]
+            
             # 获取当前有效的股票代码集合
-            current_stock_codes = {stock['code'] for stock in stock_list}
+            current_stock_codes = {code for code, _ in stock_list}
             
             # 加载检查点，但只保留当前有效的股票的结果
             processed_stocks, checkpoint_results = self._load_checkpoint()
@@ -215,22 +494,15 @@ class WorkFlow:
             valid_results = []
             
             if processed_stocks and checkpoint_results:
-                # 检查检查点中的结果是否仍然有效
-                for stock_code, result in zip(processed_stocks, checkpoint_results):
-                    if stock_code in current_stock_codes:
-                        # 检查结果的时效性（确保结果不超过24小时）
-                        if 'timestamp' not in result:
-                            continue
-                        try:
-                            result_time = datetime.strptime(result['timestamp'], '%Y-%m-%d %H:%M:%S')
-                            if (datetime.now() - result_time).total_seconds() <= 24 * 60 * 60:
-                                valid_processed_stocks.append(stock_code)
-                                valid_results.append(result)
-                            else:
-                                self.logger.info(f"股票 {stock_code} 的分析结果已过期，将重新分析")
-                        except (ValueError, TypeError):
-                            self.logger.warning(f"股票 {stock_code} 的时间戳格式无效，将重新分析")
-                            continue
+                # 一次性向量化校验检查点结果：股票仍在当前列表中，且结果不超过24小时
+                valid_mask, expired_mask = _checkpoint_masks(processed_stocks, checkpoint_results,
+                                                             current_stock_codes)
+                expired_count = int(expired_mask.sum())
+                if expired_count:
+                    self.logger.info(f"检查点中有 {expired_count} 只股票的分析结果已过期，将重新分析")
+                    
+                valid_processed_stocks = [code for code, keep in zip(processed_stocks, valid_mask) if keep]
+                valid_results = [r for r, keep in zip(checkpoint_results, valid_mask) if keep]
                     
                 if len(valid_processed_stocks) != len(processed_stocks):
                     removed_count = len(processed_stocks) - len(valid_processed_stocks)
@@ -238,115 +510,128 @@ class WorkFlow:
                     
                 if valid_processed_stocks:
                     self.logger.info(f"从检查点恢复 {len(valid_processed_stocks)} 只有效股票的分析结果")
-                    self.analysis_results = valid_results
+                    self._set_results(valid_results)
                     processed_stocks = valid_processed_stocks
                 else:
                     self.logger.info("检查点中没有有效的股票结果，将重新开始��析")
                     processed_stocks = []
-                    self.analysis_results = []
+                    self._set_results([])
+            
+            # 先把检查点压缩为有效结果：即使下面因全部分析完成而提前返回，导出的检查点也不含失效条目
+            self._rewrite_checkpoint(valid_results)
+            # 恢复的结果已写回检查点，不再在内存中保留
+            del checkpoint_results, valid_results
             
             # 过滤掉已处理的股票
-            remaining_stocks = [stock for stock in stock_list if stock['code'] not in set(processed_stocks)]
+            processed_set = set(processed_stocks)
+            remaining_stocks = [stock for stock in stock_list if stock[0] not in processed_set]
             
             if not remaining_stocks:
                 self.logger.info("所有股票都已分析完成")
-                return self.analysis_results
+                return self.result_count
                 
             total_stocks = len(remaining_stocks)
-            self.logger.info(f"开始分析剩余的 {total_stocks} 只股票")
+            self.logger.info(f"跳过已分析的 {len(stock_list) - total_stocks} 只股票，开始分析剩余的 {total_stocks} 只股票")
             
             # 初始化统计信息
             start_time = time.time()
-            success_count = len(valid_results)
+            # 统计和进度条只针对本次实际分析的股票，检查点恢复的股票不计入
+            success_count = 0
             error_count = 0
-            cache_hit_count = sum(1 for r in valid_results if r.get('from_cache', False))
-            
-            # 创建进度条
-            progress_bar = tqdm(
-                total=total_stocks,
-                desc=f"{Fore.BLUE}分析进度{Style.RESET_ALL}",
-                bar_format="{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}]",
-                ncols=100,
-                unit="只",
-                initial=len(valid_results)
-            )
+            cache_hit_count = 0
+            
+            # 检查点以JSONL逐条追加写入，避免每次保存都重写全部结果
+            checkpoint_writer = self._open_checkpoint()
+            
+            # 本次分析的所有结果使用同一个时间戳，只格式化一次
+            run_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             
-            # 使用线程池处理
-            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-                # 提交所有任务
-                future_to_stock = {
-                    executor.submit(process_stock_data, (stock, self.logger_manager)): stock 
-                    for stock in remaining_stocks
-                }
+            # 全局新闻分析只在主进程执行一次，结果随初始化参数传给每个工作进程
+            news_analysis = self.strategy_analyzer.get_news_analysis()
+            
+            # 股票很少时进程池的启动开销大于收益，直接在当前进程中执行
+            use_pool = total_stocks >= self.min_pool_size and self.max_workers > 1
+            
+            # I/O阶段在后台线程中并发预取行情数据到本地缓存；每只股票取完即交给分析阶段，
+            # 分析阶段只读缓存，进程间只传递(code, name)而不传输DataFrame
+            stop_prefetch = threading.Event()
+            fetched_stocks = self._iter_fetched_stocks(remaining_stocks, stop_prefetch)
+            
+            with checkpoint_writer, ExitStack() as stack:
+                # 创建进度条（由ExitStack负责关闭，被中断时也不会残留在终端上）
+                progress_bar = stack.enter_context(tqdm(
+                    total=total_stocks,
+                    desc=f"{Fore.BLUE}分析进度{Style.RESET_ALL}",
+                    bar_format="{l_bar}{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}{postfix}]",
+                    ncols=100,
+                    unit="只",
+                    mininterval=self.progress_mininterval,
+                    disable=not self.show_progress
+                ))
                 
-                # 处理完成的任务
-                for future in as_completed(future_to_stock):
-                    stock = future_to_stock[future]
-                    try:
-                        result = future.result()
-                        if result:
-                            success_count += 1
-                            if result.get('from_cache', False):
-                                cache_hit_count += 1
-                            self.analysis_results.append(result)
-                            processed_stocks.append(stock['code'])
-                        else:
-                            error_count += 1
-                            
-                        # 更新进度条
-                        progress_bar.update(1)
-                        progress_bar.set_postfix({
-                            '成功': f"{Fore.GREEN}{success_count}{Style.RESET_ALL}",
-                            '失败': f"{Fore.RED}{error_count}{Style.RESET_ALL}",
-                            '缓存': cache_hit_count
-                        }, refresh=True)
-                        
-                        # 每处理10只股票保存一次检查点
-                        if (success_count + error_count) % 50 == 0:
-                            self._save_checkpoint(processed_stocks, self.analysis_results)
-                            
-                        # 定期显示统计信息
-                        if (success_count + error_count) % 5000 == 0:
-                            elapsed_time = time.time() - start_time
-                            avg_time = elapsed_time / (success_count + error_count)
-                            self._print_statistics(success_count, error_count, 
-                                                cache_hit_count, avg_time)
-                            
-                    except Exception as e:
-                        self.logger.error(f"处理股票 {stock} 失败: {str(e)}")
+                if use_pool:
+                    # CPU阶段：整个分析过程共用一个进程池，工作进程只初始化一次
+                    pool = stack.enter_context(_pool_context().Pool(
+                        self.max_workers,
+                        initializer=_init_worker,
+                        initargs=(self.logger_manager, run_time, news_analysis),
+                        maxtasksperchild=self.max_tasks_per_child
+                    ))
+                    # 按块提交任务，摊薄每个任务的进程间通信开销；结果按完成顺序返回，慢任务不阻塞后续结果。
+                    # 任务块需等预取凑满才会提交，块过大会推迟分析开始并拉长尾部等待，因此按实测耗时确定
+                    results = self._pool_results(pool, fetched_stocks, total_stocks)
+                else:
+                    _init_worker(self.logger_manager, run_time, news_analysis, self.strategy_analyzer)
+                    results = map(process_stock_data, fetched_stocks)
+                # 退出时（包括Ctrl-C中断）先停止预取再终止进程池：进程池终止时要等待正在读取任务的线程，
+                # 不停止预取就得等剩余股票全部下载完
+                stack.callback(stop_prefetch.set)
+                
+                # 处理完成的任务（process_stock_data内部已捕获异常，失败时返回None）
+                last_refresh = 0.0
+                for result in results:
+                    if result:
+                        success_count += 1
+                        if result.get('from_cache', False):
+                            cache_hit_count += 1
+                        self._add_result(result)
+                        checkpoint_writer.write(utils.dumps_json_line(result))
+                    else:
                         error_count += 1
-                        progress_bar.update(1)
                         
-            # 关闭进度条
-            progress_bar.close()
-            
-            # 保存最终检查点
-            self._save_checkpoint(processed_stocks, self.analysis_results)
+                    # 更新进度条（附加信息最多每0.2秒刷新一次）
+                    progress_bar.update(1)
+                    now = time.monotonic()
+                    if now - last_refresh > 0.2:
+                        progress_bar.set_postfix({'成功': success_count, '失败': error_count,
+                                                  '缓存': cache_hit_count}, refresh=False)
+                        last_refresh = now
+                    
+                    # 每处理checkpoint_interval只股票刷新一次检查点
+                    if (success_count + error_count) % self.checkpoint_interval == 0:
+                        checkpoint_writer.flush()
+                        
+                # 关闭进度条前补上最终计数
+                progress_bar.set_postfix({'成功': success_count, '失败': error_count,
+                                          '缓存': cache_hit_count}, refresh=False)
+                        
+            self.logger.info(f"检查点已保存: {self.result_count} 只股票")
             
             # 打印最终统计信息
             total_time = time.time() - start_time
             self._print_final_statistics(total_stocks, success_count, error_count,
                                       cache_hit_count, total_time)
             
-            return self.analysis_results
+            return self.result_count
             
+        except KeyboardInterrupt:
+            # 已完成的结果已随检查点关闭写入磁盘，重新运行时从断点继续
+            self.logger.warning(f"分析被中断，已保存 {self.result_count} 只股票的分析结果到检查点")
+            raise
         except Exception as e:
-            self.logger.error(f"分析股票失败: {str(e)}")
-            self.logger.error(traceback.format_exc())
+            self.logger.exception(f"分析股票失败: {str(e)}")
             return None
 
-    def _print_statistics(self, success_count, error_count, cache_hit_count, avg_time):
-        """打印阶段性统计信息"""
-        print(f"\n{Fore.YELLOW}{'-' * 50}")
-        print(f"""处理统计:
-{Fore.CYAN}- 成功: {success_count}
-{Fore.RED}- 失败: {error_count}
-{Fore.GREEN}- 缓存命中: {cache_hit_count}
-{Fore.BLUE}- 平均耗时: {avg_time:.1f}秒/股
-{Fore.MAGENTA}- 缓存命中率: {(cache_hit_count/(success_count + error_count)*100) if (success_count + error_count) > 0 else 0:.1f}%{Style.RESET_ALL}
-""")
-        print(f"{Fore.YELLOW}{'-' * 50}{Style.RESET_ALL}")
-        
     def _print_final_statistics(self, total_stocks, success_count, error_count,
                               cache_hit_count, total_time):
         """打印最终统计信息"""
@@ -361,19 +646,35 @@ class WorkFlow:
 """)
         print(f"{Fore.GREEN}{'=' * 50}{Style.RESET_ALL}")
 
+    def _exclude_suspended(self, stock_list, spot):
+        """剔除当天没有成交的股票；开盘前或没有行情快照时原样返回"""
+        traded_codes = utils.get_traded_codes(spot)
+        if traded_codes is None:
+            return stock_list
+        active = [stock for stock in stock_list if _normalize_stock(stock)[0] in traded_codes]
+        if len(active) != len(stock_list):
+            self.logger.info(f"剔除 {len(stock_list) - len(active)} 只停牌股票")
+        return active
+        
     def prepare(self):
         """准备工作流程，包括数据获取和分析"""
         try:
             self.logger.info("开始准备工作流程...")
             
+            # 整个流程共用一份实时行情快照：股票列表缓存失效时据此生成列表，并据此剔除停牌股票
+            spot = self.data_fetcher.get_spot_snapshot()
+            
             # 获取所有A股列表
-            stock_list = self.data_fetcher.get_stock_list()
+            stock_list = self.data_fetcher.get_stock_list(spot)
             if not stock_list:
                 self.logger.error("获取股票列表失败")
                 return False
                 
             self.logger.info(f"获取到 {len(stock_list)} 只股票")
             
+            # 剔除停牌股票，免得逐只获取数据后才被剔除（股票列表缓存保留完整列表，只在分析时过滤）
+            stock_list = self._exclude_suspended(stock_list, spot)
+            
             # 执行全局新闻分析（只执行一次）
             if not self.strategy_analyzer.perform_news_analysis():
                 self.logger.warning("全局新闻分析未能完成，将继续执行其他策略")
@@ -392,66 +693,11 @@ class WorkFlow:
             self.logger.info("工作流程准备完成")
             return True
             
+        except KeyboardInterrupt:
+            # 被中断时仍为已完成的股票生成报告
+            if self.result_count:
+                self.generate_summary_report()
+            raise
         except Exception as e:
-            self.logger.error(f"工作流程准备失败: {str(e)}")
-            self.logger.error(traceback.format_exc())
+            self.logger.exception(f"工作流程准备失败: {str(e)}")
             return False
-
-    def save_analysis_results(self, stock_code, results):
-        """保存分析结果"""
-        try:
-            # 保存常规分析结果
-            if results.get('signals'):
-                signals_df = pd.DataFrame(results['signals'])
-                signals_df.to_excel(
-                    os.path.join(self.summary_dir, f'{stock_code}_signals.xlsx'),
-                    index=False
-                )
-                
-            # 保存新闻分析结果
-            news_signals = [s for s in results.get('signals', []) 
-                           if s.get('strategy') == 'NewsStrategy']
-            if news_signals:
-                news_df = pd.DataFrame(news_signals)
-                # 确保summary_dir存在
-                os.makedirs(self.summary_dir, exist_ok=True)
-                # 保存到单独的新闻分析表格
-                news_file = os.path.join(self.summary_dir, f'{stock_code}_news_analysis.xlsx')
-                news_df.to_excel(news_file, index=False)
-                self.logger.info(f"新闻分析结果已保存到: {news_file}")
-                
-        except Exception as e:
-            self.logger.error(f"保存分析结果失败: {str(e)}")
-            
-    def process_stock_data(self, stock_code):
-        """处理单个股票数据"""
-        try:
-            # 获取股票数据
-            data = self.data_fetcher.get_stock_data(stock_code)
-            if data is None:
-                return None
-            
-            # 初始化结果字典
-            results = {'signals': []}
-            
-            # 运行所有策略
-            for strategy in self.strategies:
-                try:
-                    signals = strategy.get_signals(data)
-                    if signals:
-                        results['signals'].extend(signals)
-                except Exception as e:
-                    self.logger.error(f"策略 {strategy.name} 分析失败: {str(e)}")
-                    continue
-                    
-            # 保存分析结果
-            if results['signals']:
-                self.save_analysis_results(stock_code, results)
-                
-            return results
-            
-        except Exception as e:
-            self.logger.error(f"处理股票 {stock_code} 数据失败: {str(e)}")
-            return None
-
-